@@ -1,6 +1,7 @@
 import scanpy as sc
 from scipy import sparse
 import numpy as np
+import pandas as pd
 
 
 def read(filename, **kwargs):
@@ -51,7 +52,8 @@ def normalize_hvg(adata, batch_key=None, size_factors=True, logtrans_input=True,
 
     """
 
-    adata_count = adata.copy()
+    # counts only need their own copy if ``adata.X`` is going to be modified in place
+    adata_count = adata.copy() if size_factors or logtrans_input or scale else adata
 
     if size_factors:
         sc.pp.normalize_total(adata, target_sum=target_sum, exclude_highly_expressed=True, key_added='size_factors')
@@ -62,13 +64,23 @@ def normalize_hvg(adata, batch_key=None, size_factors=True, logtrans_input=True,
         sc.pp.log1p(adata)
 
     if n_top_genes > 0 and adata.shape[1] > n_top_genes:
+        hvg = None
         if batch_key:
-            genes = _hvg_batch(adata.copy(), batch_key=batch_key, adataOut=False, target_genes=n_top_genes)
+            genes = _hvg_batch(adata, batch_key=batch_key, adataOut=False, target_genes=n_top_genes)
+        elif adata_count is adata:
+            # ``adata`` is also the count data, so keep the HVG annotation out of its ``var`` (and ``adata.raw``)
+            hvg = pd.DataFrame(sc.pp.highly_variable_genes(adata, n_top_genes=n_top_genes, inplace=False))
+            genes = hvg['highly_variable'].to_numpy()
         else:
             sc.pp.highly_variable_genes(adata, n_top_genes=n_top_genes)
             genes = adata.var['highly_variable']
         adata = adata[:, genes]
         adata_count = adata_count[:, genes]
+        if hvg is not None:
+            # the returned ``adata`` still gets the usual HVG annotation, only ``adata_count`` stays clean
+            adata = adata.copy()
+            for column in hvg.columns:
+                adata.var[column] = hvg[column].to_numpy()[genes]
 
     if scale:
         sc.pp.scale(adata)
@@ -90,19 +102,32 @@ def _hvg_batch(adata, batch_key=None, target_genes=2000, flavor='cell_ranger', n
     until HVGs in a single batch are considered.
     """
 
-    adata_hvg = adata if adataOut else adata.copy()
+    n_batches = len(adata.obs[batch_key].cat.categories)
 
-    n_batches = len(adata_hvg.obs[batch_key].cat.categories)
-
-    # Calculate double target genes per dataset
-    sc.pp.highly_variable_genes(adata_hvg,
-                                flavor=flavor,
-                                n_top_genes=target_genes,
-                                n_bins=n_bins,
-                                batch_key=batch_key)
+    # ``highly_variable_genes`` only annotates ``var`` and ``uns``, so instead of copying the whole ``adata`` we
+    # save both and restore them once the statistics have been read.
+    if not adataOut:
+        var = adata.var.copy()
+        uns_hvg = adata.uns.get('hvg')
+
+    try:
+        # Calculate double target genes per dataset
+        sc.pp.highly_variable_genes(adata,
+                                    flavor=flavor,
+                                    n_top_genes=target_genes,
+                                    n_bins=n_bins,
+                                    batch_key=batch_key)
+
+        hvg_var = adata.var[['dispersions_norm', 'highly_variable_nbatches']].copy()
+    finally:
+        if not adataOut:
+            adata.var = var
+            if uns_hvg is None:
+                adata.uns.pop('hvg', None)
+            else:
+                adata.uns['hvg'] = uns_hvg
 
-    nbatch1_dispersions = adata_hvg.var['dispersions_norm'][adata_hvg.var.highly_variable_nbatches >
-                                                            len(adata_hvg.obs[batch_key].cat.categories) - 1]
+    nbatch1_dispersions = hvg_var['dispersions_norm'][hvg_var.highly_variable_nbatches > n_batches - 1]
 
     nbatch1_dispersions.sort_values(ascending=False, inplace=True)
 
@@ -112,33 +137,36 @@ def _hvg_batch(adata, batch_key=None, target_genes=2000, flavor='cell_ranger', n
     else:
         enough = False
         print(f'Using {len(nbatch1_dispersions)} HVGs from full intersect set')
-        hvg = nbatch1_dispersions.index[:]
+        hvg_parts = [nbatch1_dispersions.index]
+        n_hvg = len(nbatch1_dispersions)
         not_n_batches = 1
 
         while not enough:
-            target_genes_diff = target_genes - len(hvg)
+            target_genes_diff = target_genes - n_hvg
 
-            tmp_dispersions = adata_hvg.var['dispersions_norm'][adata_hvg.var.highly_variable_nbatches ==
-                                                                (n_batches - not_n_batches)]
+            tmp_dispersions = hvg_var['dispersions_norm'][hvg_var.highly_variable_nbatches ==
+                                                          (n_batches - not_n_batches)]
 
             if len(tmp_dispersions) < target_genes_diff:
                 print(f'Using {len(tmp_dispersions)} HVGs from n_batch-{not_n_batches} set')
-                hvg = hvg.append(tmp_dispersions.index)
+                hvg_parts.append(tmp_dispersions.index)
+                n_hvg += len(tmp_dispersions)
                 not_n_batches += 1
 
             else:
                 print(f'Using {target_genes_diff} HVGs from n_batch-{not_n_batches} set')
                 tmp_dispersions.sort_values(ascending=False, inplace=True)
-                hvg = hvg.append(tmp_dispersions.index[:target_genes_diff])
+                hvg_parts.append(tmp_dispersions.index[:target_genes_diff])
                 enough = True
 
+        hvg = hvg_parts[0].append(hvg_parts[1:])
+
     print(f'Using {len(hvg)} HVGs')
 
     if not adataOut:
-        del adata_hvg
         return hvg.tolist()
     else:
-        return adata_hvg[:, hvg].copy()
+        return adata[:, hvg].copy()
 
 
 def subsample(adata, batch_key, fraction=0.1, specific_cell_types=None, cell_type_key=None):
@@ -41,7 +41,7 @@ def mse_loss(y_true, y_pred):
     return losses.mean_squared_error(y_true, y_pred)
 
 
-def mmd(n_conditions, beta, kernel_method='multi-scale-rbf', computation_method="general"):
+def mmd(n_conditions, beta, kernel_method='multi-scale-rbf', computation_method="general", **kwargs):
     def mmd_loss(real_labels, y_pred):
         with tf.variable_scope("mmd_loss", reuse=tf.AUTO_REUSE):
             real_labels = K.reshape(K.cast(real_labels, 'int32'), (-1,))
@@ -51,11 +51,11 @@ def mmd(n_conditions, beta, kernel_method='multi-scale-rbf', computation_method=
                 boundary = int(computation_method)
                 for i in range(boundary):
                     for j in range(boundary, n_conditions):
-                        loss += _nan2zero(compute_mmd(conditions_mmd[i], conditions_mmd[j], kernel_method))
+                        loss += _nan2zero(compute_mmd(conditions_mmd[i], conditions_mmd[j], kernel_method, **kwargs))
             else:
                 for i in range(len(conditions_mmd)):
                     for j in range(i):
-                        loss += _nan2zero(compute_mmd(conditions_mmd[i], conditions_mmd[j], kernel_method))
+                        loss += _nan2zero(compute_mmd(conditions_mmd[i], conditions_mmd[j], kernel_method, **kwargs))
             if n_conditions == 1:
                 loss = _nan2zero(tf.zeros(shape=(1,)))
             return beta * loss
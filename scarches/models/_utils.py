@@ -3,6 +3,10 @@ import tensorflow as tf
 from keras import backend as K
 import sys
 
+_MULTI_SCALE_RBF_SIGMAS = np.array([1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1, 5, 10, 15, 20, 25, 30, 35, 100,
+                                    1e3, 1e4, 1e5, 1e6], dtype=np.float32)
+_MULTI_SCALE_RBF_BETA = (1. / (2. * _MULTI_SCALE_RBF_SIGMAS)).reshape(-1, 1)
+
 
 def compute_kernel(x, y, kernel='rbf', **kwargs):
     """
@@ -12,38 +16,60 @@ def compute_kernel(x, y, kernel='rbf', **kwargs):
                 Tensor with shape [batch_size, z_dim]
             y: Tensor
                 Tensor with shape [batch_size, z_dim]
+            x_norm, y_norm: Tensor
+                Optional precomputed squared norms of x and y with shape [batch_size, 1].
+            diagonal_offset: int, Tensor or None
+                if x is a slice of y starting at this row, the distance of each row to itself is set to exactly 0.
         # Returns
             returns the computed RBF kernel between x and y
     """
     scales = kwargs.get("scales", [])
+    x_norm, y_norm = kwargs.get("x_norm"), kwargs.get("y_norm")
+    diagonal_offset = kwargs.get("diagonal_offset")
     if kernel == "rbf":
-        x_size = K.shape(x)[0]
-        y_size = K.shape(y)[0]
-        dim = K.shape(x)[1]
-        tiled_x = K.tile(K.reshape(x, K.stack([x_size, 1, dim])), K.stack([1, y_size, 1]))
-        tiled_y = K.tile(K.reshape(y, K.stack([1, y_size, dim])), K.stack([x_size, 1, 1]))
-        return K.exp(-K.mean(K.square(tiled_x - tiled_y), axis=2) / K.cast(dim, tf.float32))
+        dim = _feature_dim(x)
+        return K.exp(-squared_distance(x, y, x_norm, y_norm, diagonal_offset) / (dim * dim))
     elif kernel == 'raphy':
-        scales = K.variable(value=np.asarray(scales))
-        squared_dist = K.expand_dims(squared_distance(x, y), 0)
-        scales = K.expand_dims(K.expand_dims(scales, -1), -1)
-        weights = K.eval(K.shape(scales)[0])
-        weights = K.variable(value=np.asarray(weights))
-        weights = K.expand_dims(K.expand_dims(weights, -1), -1)
+        scales = np.asarray(scales, dtype=np.float32)
+        weights = float(scales.shape[0])
+        squared_dist = K.expand_dims(squared_distance(x, y, x_norm, y_norm, diagonal_offset), 0)
+        scales = K.reshape(K.constant(scales), (-1, 1, 1))
         return K.sum(weights * K.exp(-squared_dist / (K.pow(scales, 2))), 0)
     elif kernel == "multi-scale-rbf":
-        sigmas = [1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1, 5, 10, 15, 20, 25, 30, 35, 100, 1e3, 1e4, 1e5, 1e6]
-
-        beta = 1. / (2. * (K.expand_dims(sigmas, 1)))
-        distances = squared_distance(x, y)
+        beta = K.constant(_MULTI_SCALE_RBF_BETA)
+        distances = squared_distance(x, y, x_norm, y_norm, diagonal_offset)
         s = K.dot(beta, K.reshape(distances, (1, -1)))
 
-        return K.reshape(tf.reduce_sum(tf.exp(-s), 0), K.shape(distances)) / len(sigmas)
+        return K.reshape(tf.reduce_sum(tf.exp(-s), 0), K.shape(distances)) / len(_MULTI_SCALE_RBF_SIGMAS)
+
+
+def _feature_dim(x):
+    # use the static z_dim when it is known so the graph (and XLA) sees a constant instead of a shape lookup
+    dim = K.int_shape(x)[1]
+    if dim is None:
+        return K.cast(K.shape(x)[1], tf.float32)
+    return float(dim)
+
+
+def _squared_norm(x):
+    return K.sum(K.square(x), axis=1, keepdims=True)
 
 
-def squared_distance(x, y):  # returns the pairwise euclidean distance
-    r = K.expand_dims(x, axis=1)
-    return K.sum(K.square(r - y), axis=-1)
+def squared_distance(x, y, x_norm=None, y_norm=None, diagonal_offset=None):
+    # returns the pairwise squared euclidean distance, ``x_norm`` and ``y_norm`` are optional precomputed squared norms.
+    # ||x - y||^2 = ||x||^2 + ||y||^2 - 2 * x.y^T, so the [x_size, y_size, z_dim] difference tensor is never built
+    if x_norm is None:
+        x_norm = _squared_norm(x)
+    if y_norm is None:
+        y_norm = _squared_norm(y)
+    distances = x_norm + K.transpose(y_norm) - 2. * tf.matmul(x, y, transpose_b=True)
+    if diagonal_offset is not None:
+        # the expansion leaves rounding errors of about 1e-6 * ||x||^2 on self-distances, which the smallest
+        # bandwidths of the multi-scale kernel turn into large errors, so set them to exactly 0
+        self_mask = tf.one_hot(tf.range(K.shape(x)[0]) + diagonal_offset, K.shape(y)[0],
+                               on_value=True, off_value=False, dtype=tf.bool)
+        distances = tf.where(self_mask, tf.zeros_like(distances), distances)
+    return K.maximum(distances, 0.)
 
 
 def compute_mmd(x, y, kernel, **kwargs):  # [batch_size, z_dim] [batch_size, z_dim]
@@ -54,12 +80,28 @@ def compute_mmd(x, y, kernel, **kwargs):  # [batch_size, z_dim] [batch_size, z_d
                 Tensor with shape [batch_size, z_dim]
             y: Tensor
                 Tensor with shape [batch_size, z_dim]
+            jit_compile: bool
+                if `True`, the computation is compiled with XLA. XLA compiles once per distinct input shape, so
+                this only pays off when x and y have fixed shapes.
+            kwargs:
+                Other ``compute_kernel`` arguments, e.g. ``scales``.
         # Returns
             returns the computed MMD between x and y
     """
-    x_kernel = compute_kernel(x, x, kernel=kernel, **kwargs)
-    y_kernel = compute_kernel(y, y, kernel=kernel, **kwargs)
-    xy_kernel = compute_kernel(x, y, kernel=kernel, **kwargs)
+    if kwargs.pop("jit_compile", False):
+        # let XLA fuse the distance, exp and mean ops instead of running them as separate kernels
+        with tf.xla.experimental.jit_scope():
+            return _compute_mmd(x, y, kernel, **kwargs)
+    return _compute_mmd(x, y, kernel, **kwargs)
+
+
+def _compute_mmd(x, y, kernel, **kwargs):
+    # squared norms of x and y are shared by all three kernels
+    x_norm = _squared_norm(x)
+    y_norm = _squared_norm(y)
+    x_kernel = compute_kernel(x, x, kernel=kernel, x_norm=x_norm, y_norm=x_norm, diagonal_offset=0, **kwargs)
+    y_kernel = compute_kernel(y, y, kernel=kernel, x_norm=y_norm, y_norm=y_norm, diagonal_offset=0, **kwargs)
+    xy_kernel = compute_kernel(x, y, kernel=kernel, x_norm=x_norm, y_norm=y_norm, **kwargs)
     return K.mean(x_kernel) + K.mean(y_kernel) - 2 * K.mean(xy_kernel)
 
 
@@ -244,10 +244,8 @@ class scArches(CVAE):
         adata = remove_sparsity(adata)
 
         encoder_labels, _ = label_encoder(adata, self.condition_encoder, batch_key)
-        decoder_labels, _ = label_encoder(adata, self.condition_encoder, batch_key)
-
         encoder_labels = to_categorical(encoder_labels, num_classes=self.n_conditions)
-        decoder_labels = to_categorical(decoder_labels, num_classes=self.n_conditions)
+        decoder_labels = encoder_labels
 
         cvae_inputs = [adata.X, encoder_labels, decoder_labels]
 
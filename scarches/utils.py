@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 import scanpy as sc
 from scipy import sparse
 
@@ -22,23 +23,31 @@ def label_encoder(adata, le=None, condition_key='condition'):
         le: dict
             dictionary with labels and encoded labels as key, value pairs.
     """
-    labels = np.zeros(adata.shape[0])
-    unique_labels = sorted(adata.obs[condition_key].unique().tolist())
-    if isinstance(le, dict):
-        if not set(unique_labels).issubset(set(le.keys())):
-            print("WARNING: unique_labels is not subset of the given encoder")
+    conditions = adata.obs[condition_key]
+    if not isinstance(le, dict):
+        # codes of the sorted unique labels are exactly the encoded labels, missing values (-1) are encoded as 0
+        codes, unique_labels = pd.factorize(conditions.to_numpy(), sort=True)
+        le = {label: idx for idx, label in enumerate(unique_labels.tolist())}
+        labels = np.maximum(codes, 0).astype(np.float64)
+        return labels.reshape(-1, 1), le
+
+    unique_labels = conditions.unique().tolist()
+    if not set(unique_labels).issubset(set(le.keys())):
+        print("WARNING: unique_labels is not subset of the given encoder")
+
+    # conditions missing from ``le`` are encoded as 0
+    if isinstance(conditions.dtype, pd.CategoricalDtype):
+        # the trailing 0 is picked up by missing values, whose code is -1
+        code_to_label = np.array([le.get(category, 0) for category in conditions.cat.categories] + [0],
+                                 dtype=np.float64)
+        labels = code_to_label[conditions.cat.codes.to_numpy()]
     else:
-        le = dict()
-        for idx, label in enumerate(unique_labels):
-            le[label] = idx
-
-    for label, encoded in le.items():
-        labels[adata.obs[condition_key] == label] = encoded
+        labels = conditions.map(le).fillna(0).to_numpy(dtype=np.float64)
 
     return labels.reshape(-1, 1), le
 
 
-def remove_sparsity(adata):
+def remove_sparsity(adata, chunk_size=8192, out=None):
     """
         If ``adata.X`` is a sparse matrix, this will convert it in to normal matrix.
 
@@ -46,6 +55,11 @@ def remove_sparsity(adata):
         ----------
         adata: :class:`~anndata.AnnData`
             Annotated data matrix.
+        chunk_size: int
+            Number of observations (cells) to densify at a time.
+        out: :class:`~numpy.ndarray` or None
+            Optional C-contiguous buffer with the shape and dtype of ``adata.X`` to densify into, e.g. one that is
+            reused across calls. If `None`, a new array will be allocated.
 
         Returns
         -------
@@ -53,7 +67,15 @@ def remove_sparsity(adata):
             Annotated dataset.
     """
     if sparse.issparse(adata.X):
-        new_adata = sc.AnnData(X=adata.X.A, obs=adata.obs.copy(deep=True), var=adata.var.copy(deep=True))
+        X = adata.X.tocsr()
+        if out is None:
+            out = np.empty(X.shape, dtype=X.dtype)
+        for start in range(0, X.shape[0], chunk_size):
+            # ``toarray`` adds the sparse entries to ``out``, so each chunk has to be zeroed first
+            out_chunk = out[start:start + chunk_size]
+            out_chunk.fill(0)
+            X[start:start + chunk_size].toarray(out=out_chunk)
+        new_adata = sc.AnnData(X=out, obs=adata.obs.copy(deep=True), var=adata.var.copy(deep=True))
         return new_adata
 
     return adata
@@ -61,7 +83,8 @@ def remove_sparsity(adata):
 
 def train_test_split(adata, train_frac=0.85):
     """
-        Split ``adata`` into train and test annotated datasets.
+        Split ``adata`` into train and test annotated datasets. Both returned datasets are views of ``adata``,
+        so avoid densifying both of them at the same time on large datasets.
 
         Parameters
         ----------
@@ -78,13 +101,11 @@ def train_test_split(adata, train_frac=0.85):
             Test annotated dataset.
     """
     train_size = int(adata.shape[0] * train_frac)
-    indices = np.arange(adata.shape[0])
-    np.random.shuffle(indices)
-    train_idx = indices[:train_size]
-    test_idx = indices[train_size:]
+    train_mask = np.zeros(adata.shape[0], dtype=bool)
+    train_mask[np.random.permutation(adata.shape[0])[:train_size]] = True
 
-    train_data = adata[train_idx, :]
-    valid_data = adata[test_idx, :]
+    train_data = adata[train_mask, :]
+    valid_data = adata[~train_mask, :]
 
     return train_data, valid_data
 
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scanpy as sc
+
+from scarches.data import normalize_hvg, _hvg_batch
+
+
+def test_normalize_hvg_annotation_without_normalization():
+    rng = np.random.RandomState(0)
+    adata = sc.AnnData(X=rng.poisson(2., size=(60, 30)).astype(np.float32))
+
+    normalized = normalize_hvg(adata, size_factors=False, logtrans_input=False, scale=False, n_top_genes=10)
+
+    assert normalized.shape == (60, 10)
+    for column in ['highly_variable', 'means', 'dispersions', 'dispersions_norm']:
+        assert column in normalized.var.columns
+        assert column not in normalized.raw.var.columns
+
+
+@pytest.mark.parametrize("uns_hvg", [None, {'flavor': 'seurat'}])
+def test_hvg_batch_leaves_adata_unchanged(uns_hvg):
+    rng = np.random.RandomState(0)
+    adata = sc.AnnData(X=np.log1p(rng.poisson(2., size=(120, 50)).astype(np.float32)))
+    adata.obs['batch'] = pd.Categorical(['a', 'b', 'c'] * 40)
+    adata.var['gene_type'] = 'protein_coding'
+    if uns_hvg is not None:
+        adata.uns['hvg'] = uns_hvg
+    var = adata.var.copy()
+    uns_keys = set(adata.uns.keys())
+
+    expected = _hvg_batch(adata.copy(), batch_key='batch', target_genes=10)
+    genes = _hvg_batch(adata, batch_key='batch', target_genes=10)
+
+    assert genes == expected
+    pd.testing.assert_frame_equal(adata.var, var)
+    assert set(adata.uns.keys()) == uns_keys
+    if uns_hvg is not None:
+        assert adata.uns['hvg'] == uns_hvg
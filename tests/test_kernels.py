@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from keras import backend as K
+
+from scarches.models._utils import compute_kernel, compute_mmd, _MULTI_SCALE_RBF_SIGMAS
+
+SCALES = [0.5, 1., 2.]
+
+
+def _broadcast_kernel(x, y, kernel):
+    # reference implementation on the explicit [x_size, y_size, z_dim] differences, in float64
+    diff = np.square(x[:, None, :] - y[None, :, :])
+    if kernel == "rbf":
+        return np.exp(-diff.mean(axis=2) / x.shape[1])
+    squared_dist = diff.sum(axis=2)
+    if kernel == "raphy":
+        scales = np.asarray(SCALES)[:, None, None]
+        return len(SCALES) * np.exp(-squared_dist[None] / scales ** 2).sum(axis=0)
+    beta = 1. / (2. * np.asarray(_MULTI_SCALE_RBF_SIGMAS, dtype=np.float64))[:, None, None]
+    return np.exp(-beta * squared_dist[None]).mean(axis=0)
+
+
+def _data():
+    rng = np.random.RandomState(0)
+    x = rng.normal(scale=2., size=(50, 10)).astype(np.float32)
+    y = rng.normal(loc=0.5, scale=2., size=(40, 10)).astype(np.float32)
+    return x, y
+
+
+@pytest.mark.parametrize("kernel", ["rbf", "raphy", "multi-scale-rbf"])
+def test_compute_kernel(kernel):
+    x, y = _data()
+
+    xx = K.eval(compute_kernel(K.constant(x), K.constant(x), kernel=kernel, scales=SCALES, diagonal_offset=0))
+    xy = K.eval(compute_kernel(K.constant(x), K.constant(y), kernel=kernel, scales=SCALES))
+
+    np.testing.assert_allclose(xx, _broadcast_kernel(x, x, kernel), rtol=1e-4, atol=1e-5)
+    np.testing.assert_allclose(xy, _broadcast_kernel(x, y, kernel), rtol=1e-4, atol=1e-5)
+
+
+@pytest.mark.parametrize("kernel", ["rbf", "raphy", "multi-scale-rbf"])
+def test_compute_mmd(kernel):
+    x, y = _data()
+    expected = (_broadcast_kernel(x, x, kernel).mean() + _broadcast_kernel(y, y, kernel).mean()
+                - 2 * _broadcast_kernel(x, y, kernel).mean())
+
+    mmd = K.eval(compute_mmd(K.constant(x), K.constant(y), kernel, scales=SCALES))
+
+    np.testing.assert_allclose(mmd, expected, rtol=1e-4, atol=1e-5)
+
+
+@pytest.mark.parametrize("kernel", ["rbf", "raphy", "multi-scale-rbf"])
+def test_compute_mmd_jit_compile(kernel):
+    x, y = _data()
+
+    expected = K.eval(compute_mmd(K.constant(x), K.constant(y), kernel, scales=SCALES))
+    mmd = K.eval(compute_mmd(K.constant(x), K.constant(y), kernel, scales=SCALES, jit_compile=True))
+
+    np.testing.assert_allclose(mmd, expected, rtol=1e-4, atol=1e-5)
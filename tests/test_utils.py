@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import scanpy as sc
+from scipy import sparse
+
+from scarches.utils import label_encoder, remove_sparsity
+
+
+def _loop_label_encoder(adata, le, condition_key):
+    # previous implementation: one boolean scan per encoded label, everything else stays 0
+    labels = np.zeros(adata.shape[0])
+    for label, encoded in le.items():
+        labels[adata.obs[condition_key] == label] = encoded
+    return labels.reshape(-1, 1)
+
+
+def _adata(conditions):
+    adata = sc.AnnData(X=np.zeros((len(conditions), 2)))
+    adata.obs['condition'] = conditions
+    return adata
+
+
+def test_label_encoder_categorical():
+    values = ['B', 'A', np.nan, 'C', 'A', 'D', np.nan, 'B']
+    conditions = pd.Categorical(values, categories=['A', 'B', 'C', 'D', 'unused'])
+    adata = _adata(conditions)
+    le = {'A': 2, 'B': 1, 'C': 3, 'unused': 4, 'not-present': 5}
+
+    labels, encoder = label_encoder(adata, le=le, condition_key='condition')
+
+    assert encoder is le
+    np.testing.assert_array_equal(labels, _loop_label_encoder(adata, le, 'condition'))
+
+
+def test_label_encoder_object():
+    values = ['B', 'A', 'C', 'A', 'D', 'B']
+    adata = _adata(pd.Series(values, dtype=object).values)
+    le = {'A': 2, 'B': 1, 'C': 3}
+
+    labels, _ = label_encoder(adata, le=le, condition_key='condition')
+
+    np.testing.assert_array_equal(labels, _loop_label_encoder(adata, le, 'condition'))
+
+
+def test_label_encoder_new_encoder():
+    values = ['B', 'A', 'C', 'A', 'B']
+    adata = _adata(pd.Categorical(values, categories=['C', 'B', 'A']))
+
+    labels, le = label_encoder(adata, le=None, condition_key='condition')
+
+    assert le == {'A': 0, 'B': 1, 'C': 2}
+    np.testing.assert_array_equal(labels, _loop_label_encoder(adata, le, 'condition'))
+
+
+def test_remove_sparsity():
+    X = sparse.random(30, 8, density=0.3, format='csr', dtype=np.float32, random_state=0)
+    adata = sc.AnnData(X=X)
+
+    # chunk size that does not divide the number of cells
+    dense = remove_sparsity(adata, chunk_size=7)
+
+    np.testing.assert_array_equal(dense.X, X.toarray())
+
+
+def test_remove_sparsity_reused_buffer():
+    X = sparse.random(30, 8, density=0.3, format='csr', dtype=np.float32, random_state=0)
+    adata = sc.AnnData(X=X)
+    # a buffer left over from a previous call must be overwritten, not accumulated into
+    out = np.full(X.shape, 7., dtype=np.float32)
+
+    dense = remove_sparsity(adata, chunk_size=7, out=out)
+
+    np.testing.assert_array_equal(out, X.toarray())
+    np.testing.assert_array_equal(dense.X, X.toarray())